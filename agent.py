@@ -1,6 +1,7 @@
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, START, END
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
 from typing import TypedDict, Annotated, Sequence
 from operator import add as add_messages
 
@@ -11,29 +12,36 @@ class AgentState(TypedDict):
     """
     messages: Annotated[Sequence[BaseMessage], add_messages]
 
-def make_process(llm):
-    def process(state: AgentState) -> AgentState:
-        """
-        Node function that takes in a state (with all previous messages),
-        invokes the LLM, and returns the new message to be appended.
-        """
-        response = llm.invoke(state["messages"])
-        return {"messages": [response]}  # LangGraph will merge this with previous state
-    return process
+def process(state: AgentState, config: RunnableConfig) -> AgentState:
+    """
+    Node function that takes in a state (with all previous messages),
+    invokes the LLM bound in `config["configurable"]["llm"]`, and returns the new message to be appended.
+    """
+    llm = config["configurable"]["llm"]
+    response = llm.invoke(state["messages"])
+    return {"messages": [response]}  # LangGraph will merge this with previous state
 
-def get_agent(api_key: str):
+def get_llm(api_key: str):
     """
-    Constructs and compiles a LangGraph agent with memory-based state handling.
-    Returns the compiled agent ready to invoke.
+    Builds the GPT-4o chat model for the given key.
+    Used directly by the UI to stream tokens, and by `get_agent` for graph invocations.
     """
-    llm = ChatOpenAI(
+    return ChatOpenAI(
         model="gpt-4o",
         temperature=0.7,
         openai_api_key=api_key  # Use session key here
     )
 
-    graph = StateGraph(AgentState)
-    graph.add_node("process", make_process(llm))
-    graph.add_edge(START, "process")
-    graph.add_edge("process", END)
-    return graph.compile()
+# The graph does not depend on the API key, so it is compiled once at import
+_graph = StateGraph(AgentState)
+_graph.add_node("process", process)
+_graph.add_edge(START, "process")
+_graph.add_edge("process", END)
+_COMPILED = _graph.compile()
+
+def get_agent(llm):
+    """
+    Binds the precompiled LangGraph agent to the given chat model.
+    Returns a runnable agent ready to invoke.
+    """
+    return _COMPILED.with_config(configurable={"llm": llm})
\ No newline at end of file
@@ -11,42 +11,72 @@ from langchain_core.messages import (
     ToolMessage,
     BaseMessage,
 )
-from agent import get_agent
+from agent import get_agent, get_llm
 
 # -------------------- DATABASE SETUP --------------------
+from utils.db_writer import start_writer
+from utils.init_db import init_db
+
 db_path = os.path.join(os.path.dirname(__file__), "chat_messages.db")
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS sessions (
-        id TEXT PRIMARY KEY,
-        name TEXT NOT NULL,
-        user_hash TEXT NOT NULL,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-""")
-
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS chat_messages (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        session_id TEXT NOT NULL,
-        type TEXT CHECK(type IN ('human', 'ai', 'system', 'tool', 'function')) NOT NULL,
-        content TEXT NOT NULL,
-        name TEXT,
-        tool_call_id TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-""")
-conn.commit()
+
+@st.cache_resource(show_spinner=False)
+def _open_db(db_path: str):
+    """
+    Start the writer, create the schema and open the shared read connection, once per process.
+    Writes never touch the read connection because they are serialized through the background writer.
+    """
+    # All writes go through one background thread that owns the write connection
+    return init_db(start_writer(db_path), db_path)
+
+conn = _open_db(db_path)
 
 # -------------------- UTILITIES --------------------
-from utils.hash_token import hash_token
+from utils.hash_token import hash_token, legacy_hash_token
 from utils.create_session import create_session
 from utils.get_sessions_by_user import get_sessions_by_user
+from utils.migrate_legacy_sessions import migrate_legacy_sessions
 from utils.serialize_message import serialize_message
 from utils.deserialize_message import deserialize_message
-from utils.history_manager import load_history, save_history
+from utils.history_manager import load_history, save_history, trim_history
+from utils.trim_context import trim_context
+
+# -------------------- HISTORY WINDOW --------------------
+HISTORY_PAGE_SIZE = 50  # messages fetched per DB page
+MAX_IN_MEMORY = 200     # messages kept in session_state per session
+
+def _load_page(session_id, before_id=None):
+    """Fetch one page of history, move the session's paging cursor to it, and note when nothing older is left."""
+    page = load_history(conn, session_id, limit=HISTORY_PAGE_SIZE, before_id=before_id)
+    if page:
+        st.session_state.history_cursor[session_id] = int(page[0].id)
+    if len(page) < HISTORY_PAGE_SIZE:
+        st.session_state.history_complete.add(session_id)
+    return page
+
+def _trim_session(session_id):
+    """Cap a session's in-memory messages at MAX_IN_MEMORY, keeping its paging cursor in step."""
+    messages = st.session_state.loaded_sessions.get(session_id)
+    if not messages or not trim_history(messages, MAX_IN_MEMORY):
+        return
+    st.session_state.history_complete.discard(session_id)
+    # Every message in memory is saved and carries its row id, so the oldest kept one is the cursor
+    oldest = next(m for m in messages if not isinstance(m, SystemMessage))
+    st.session_state.history_cursor[session_id] = int(oldest.id)
+
+# -------------------- SESSION LIST CACHE --------------------
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_sessions(user_hash: str):
+    """Sidebar session list; cleared explicitly whenever sessions are created or re-keyed."""
+    return get_sessions_by_user(conn, user_hash)
+
+# -------------------- AGENT CACHE --------------------
+@st.cache_resource(show_spinner=False, ttl=1800, max_entries=32)
+def _cached_llm(user_hash: str, _api_key: str):
+    """
+    Chat model per user, built only after the key is validated; the raw key is excluded from the cache hash.
+    Entries expire after 30 minutes and at most 32 are kept, so logged-out or abandoned keys do not linger.
+    """
+    return get_llm(_api_key)
 
 # -------------------- AUTH GATE (OPENAI API) --------------------
 st.set_page_config(page_title="GPT-4o Agent", page_icon="🧠")
@@ -64,15 +94,20 @@ if "openai_api_key" not in st.session_state:
     token_input = st.text_input("Enter your OpenAI API Key:", type="password")
 
     if st.button("Start Chatting") and token_input:
+        user_hash = hash_token(token_input)
         try:
-            # Validate token by invoking a test query
-            temp_agent = get_agent(token_input)
+            # Validate token by invoking a test query; not cached, so rejected keys are not retained
+            temp_agent = get_agent(get_llm(token_input))
             _ = temp_agent.invoke({"messages": [HumanMessage(content="Hello!")]})
-            st.session_state["openai_api_key"] = token_input
-            st.session_state["user_hash"] = hash_token(token_input)
-            st.rerun()
         except Exception:
             st.error("❌ Invalid token. Please check and try again.")
+            st.stop()
+        # Re-key sessions stored under the old SHA-256 hash of this token
+        if migrate_legacy_sessions(conn, legacy_hash_token(token_input), user_hash):
+            _cached_sessions.clear()
+        st.session_state["openai_api_key"] = token_input
+        st.session_state["user_hash"] = user_hash
+        st.rerun()
     st.stop()
 
 # -------------------- STREAMLIT APP --------------------
@@ -86,7 +121,13 @@ with st.sidebar:
         st.error("Authentication error. Please log in again.")
         st.stop()
 
-    sessions = get_sessions_by_user(st.session_state["user_hash"])
+    # Messages already loaded this browser session, keyed by session id
+    if "loaded_sessions" not in st.session_state:
+        st.session_state.loaded_sessions = {}
+        st.session_state.history_complete = set()
+        st.session_state.history_cursor = {}  # oldest row id held in memory per session
+
+    sessions = _cached_sessions(st.session_state["user_hash"])
     session_names = [s[1] for s in sessions]
     selected_option = st.selectbox("Select session", session_names + ["➕ New session"])
 
@@ -94,8 +135,10 @@ with st.sidebar:
         new_session_name = st.text_input("Enter session name")
         if new_session_name and st.button("Create Session"):
             selected_id = create_session(new_session_name, st.session_state["user_hash"])
+            _cached_sessions.clear()
             st.session_state.session_id = selected_id
-            st.session_state.messages = []
+            st.session_state.messages = st.session_state.loaded_sessions[selected_id] = []
+            st.session_state.history_complete.add(selected_id)
             st.rerun()
         elif "session_id" not in st.session_state:
             st.stop()
@@ -104,22 +147,39 @@ with st.sidebar:
     else:
         selected_id = next(s[0] for s in sessions if s[1] == selected_option)
         if st.session_state.get("session_id") != selected_id:
+            if "session_id" in st.session_state:
+                _trim_session(st.session_state.session_id)
             st.session_state.session_id = selected_id
-            st.session_state.messages = load_history(selected_id)
+            if selected_id not in st.session_state.loaded_sessions:
+                st.session_state.loaded_sessions[selected_id] = _load_page(selected_id)
+            st.session_state.messages = st.session_state.loaded_sessions[selected_id]
             st.rerun()
 
     st.markdown("---")
     if st.button("🔒 Log out"):
-        for k in ["openai_api_key", "user_hash", "session_id", "messages"]:
+        for k in ["openai_api_key", "user_hash", "session_id", "messages", "loaded_sessions", "history_complete", "history_cursor"]:
             st.session_state.pop(k, None)
         st.rerun()
 
 # ---- INITIALIZE MEMORY ----
 if "messages" not in st.session_state:
-    history = load_history(st.session_state.session_id)
+    history = _load_page(st.session_state.session_id)
     if not history:
         history = [SystemMessage(content="You are a helpful assistant. Answer concisely.")]
-    st.session_state.messages = history
+    st.session_state.messages = st.session_state.loaded_sessions[st.session_state.session_id] = history
+
+# ---- LOAD OLDER MESSAGES ----
+start = sum(1 for m in st.session_state.messages if isinstance(m, SystemMessage))
+if (
+    len(st.session_state.messages) > start
+    and st.session_state.session_id not in st.session_state.history_complete
+    and st.button("⬆️ Load older messages")
+):
+    oldest = st.session_state.messages[start]
+    before_id = st.session_state.history_cursor.get(st.session_state.session_id, int(oldest.id))
+    older = _load_page(st.session_state.session_id, before_id=before_id)
+    st.session_state.messages[start:start] = older
+    st.rerun()
 
 # ---- DISPLAY CHAT MESSAGES ----
 for msg in st.session_state.messages:
@@ -132,24 +192,25 @@ for msg in st.session_state.messages:
 user_input = st.chat_input("Ask me anything...")
 
 if user_input:
-    user_msg = HumanMessage(content=user_input)
-    st.session_state.messages.append(user_msg)
+    turn_start = len(st.session_state.messages)
+    st.session_state.messages.append(HumanMessage(content=user_input))
 
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    with st.chat_message("assistant"):
-        placeholder = st.empty()
-        placeholder.markdown("_Thinking..._")
-
-    agent = get_agent(st.session_state["openai_api_key"])
-    result = agent.invoke({"messages": st.session_state.messages})
-
-    new_messages = result["messages"][len(st.session_state.messages):]
-    st.session_state.messages = result["messages"]
-
-    if new_messages:
-        bot_reply = new_messages[0].content
-        placeholder.markdown(bot_reply)
-
-    save_history(st.session_state.session_id, [user_msg, new_messages[0]])
+    # Stream tokens as they arrive; the graph agent is kept for non-UI invocations
+    llm = _cached_llm(st.session_state["user_hash"], st.session_state["openai_api_key"])
+    context = trim_context(st.session_state.messages)
+    try:
+        with st.chat_message("assistant"):
+            bot_reply = st.write_stream(chunk.content for chunk in llm.stream(context))
+        st.session_state.messages.append(AIMessage(content=bot_reply))
+
+        # Persist exactly the messages added this turn, once; waits so each gets its row id
+        save_history(st.session_state.session_id, st.session_state.messages[turn_start:])
+    except Exception as e:
+        # Nothing from this turn was saved, so keep memory in step with the DB
+        del st.session_state.messages[turn_start:]
+        st.error(f"❌ The reply could not be completed: {e}")
+        st.stop()
+    _trim_session(st.session_state.session_id)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import logging
+import sqlite3
+
+import pytest
+
+from utils.db_writer import DBWriter
+
+
+def _writer(tmp_path, start=True):
+    writer = DBWriter(str(tmp_path / "chat.db"))
+    if start:
+        writer.start()
+    return writer
+
+
+def _rows(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "chat.db"))
+    return [r[0] for r in conn.execute("SELECT a FROM t ORDER BY a")]
+
+
+def test_batched_jobs_commit_and_failed_job_is_atomic(tmp_path, caplog):
+    setup = _writer(tmp_path)
+    setup.submit("CREATE TABLE t (a INTEGER CHECK (a > 0))", wait=True)
+
+    # Queue jobs before the thread starts so they are committed as one batch
+    writer = _writer(tmp_path, start=False)
+    writer.submit("INSERT INTO t VALUES (?)", (1,))
+    # Second row violates the CHECK; the first row of this job must not be committed either
+    writer.submit("INSERT INTO t VALUES (?)", [(2,), (-2,)], many=True)
+    writer.submit("INSERT INTO t VALUES (?)", (3,))
+    with caplog.at_level(logging.ERROR, logger="utils.db_writer"):
+        writer.start()
+        writer.submit("INSERT INTO t VALUES (?)", (4,), wait=True)
+
+    assert _rows(tmp_path) == [1, 3, 4]
+    assert "Background write failed" in caplog.text
+
+
+def test_waited_job_reraises_error_and_writer_keeps_running(tmp_path):
+    writer = _writer(tmp_path)
+    writer.submit("CREATE TABLE t (a INTEGER CHECK (a > 0))", wait=True)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.submit("INSERT INTO t VALUES (?)", (-1,), wait=True)
+    writer.submit("INSERT INTO t VALUES (?)", (5,), wait=True)
+
+    assert _rows(tmp_path) == [5]
+
+
+def test_waited_insert_returns_row_ids(tmp_path):
+    writer = _writer(tmp_path)
+    writer.submit("CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT, a INTEGER)", wait=True)
+
+    assert writer.submit("INSERT INTO t (a) VALUES (?)", (1,), wait=True) == 1
+    assert writer.submit("INSERT INTO t (a) VALUES (?)", [(2,), (3,)], many=True, wait=True) == [2, 3]
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+import utils.db_writer as db_writer
+from utils.db_writer import DBWriter
+from utils.history_manager import load_history, save_history, trim_history
+
+
+def _turn(i):
+    return [HumanMessage(content=f"q{i}"), AIMessage(content=f"a{i}")]
+
+
+def test_trim_history_caps_messages_without_row_ids():
+    messages = [SystemMessage(content="sys")]
+    for i in range(250):
+        messages.extend(_turn(i))
+        trim_history(messages, 200)
+    assert len(messages) == 201
+    assert isinstance(messages[0], SystemMessage)
+    assert messages[-1].content == "a249"
+
+
+def test_trim_history_stays_bounded_after_a_loaded_page():
+    messages = [HumanMessage(content=f"old{i}", id=str(i)) for i in range(50)]
+    for i in range(200):
+        messages.extend(_turn(i))
+        trim_history(messages, 200)
+    assert len(messages) == 200
+    assert messages[-1].content == "a199"
+
+
+def test_trim_history_reports_dropped_count():
+    messages = [SystemMessage(content="sys")] + _turn(0) + _turn(1)
+    assert trim_history(messages, 4) == 0
+    assert trim_history(messages, 3) == 1
+    assert [m.content for m in messages] == ["sys", "a0", "q1", "a1"]
+
+
+def _db(n):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            name TEXT,
+            tool_call_id TEXT,
+            content_z BLOB
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO chat_messages (session_id, type, content) VALUES (?, ?, ?)",
+        [("s", "human", f"m{i}") for i in range(n)],
+    )
+    return conn
+
+
+def test_load_history_pages_backwards_in_order():
+    conn = _db(5)
+    newest = load_history(conn, "s", limit=2)
+    assert [m.content for m in newest] == ["m3", "m4"]
+    older = load_history(conn, "s", limit=2, before_id=int(newest[0].id))
+    assert [m.content for m in older] == ["m1", "m2"]
+
+
+def test_save_history_stamps_row_ids(tmp_path, monkeypatch):
+    db = str(tmp_path / "chat.db")
+    writer = DBWriter(db).start()
+    monkeypatch.setattr(db_writer, "_writer", writer)
+    writer.submit("""
+        CREATE TABLE chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            type TEXT CHECK(type IN ('human', 'ai', 'system', 'tool', 'function')) NOT NULL,
+            content TEXT NOT NULL,
+            name TEXT,
+            tool_call_id TEXT,
+            content_z BLOB
+        )
+    """, wait=True)
+
+    turn = _turn(0)
+    save_history("s", turn)
+    assert [m.id for m in turn] == ["1", "2"]
+
+    # A failed save raises and stamps nothing, so callers can drop the unsaved turn
+    bad = [HumanMessage(content="q1"), AIMessage(content="a1")]
+    bad[1].type = "bogus"
+    with pytest.raises(sqlite3.IntegrityError):
+        save_history("s", bad)
+    assert [m.id for m in bad] == [None, None]
+    assert [m.content for m in load_history(sqlite3.connect(db), "s")] == ["q0", "a0"]
@@ -0,0 +1,71 @@
+import sqlite3
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.db_writer import DBWriter
+from utils.deserialize_message import deserialize_message
+from utils.init_db import init_db
+from utils.serialize_message import COMPRESS_MIN_BYTES, serialize_message
+
+
+def test_short_content_is_stored_as_text():
+    text = "x" * COMPRESS_MIN_BYTES
+    row = serialize_message(HumanMessage(content=text), "s")
+    assert row[2] == text
+    assert row[5] is None
+
+
+def test_long_content_is_compressed_and_round_trips():
+    text = "hello world " * 100
+    row = serialize_message(AIMessage(content=text), "s")
+    assert row[2] == ""
+    assert row[5] is not None and len(row[5]) < len(text)
+    msg = deserialize_message((row[1], row[2], row[3], row[4], row[5]))
+    assert isinstance(msg, AIMessage)
+    assert msg.content == text
+
+
+def test_threshold_is_measured_in_utf8_bytes():
+    text = "é" * (COMPRESS_MIN_BYTES // 2 + 1)  # under the threshold in characters, over it in bytes
+    row = serialize_message(HumanMessage(content=text), "s")
+    assert row[2] == ""
+    assert deserialize_message((row[1], row[2], row[3], row[4], row[5])).content == text
+
+
+def test_legacy_row_without_blob_loads_from_text():
+    msg = deserialize_message(("human", "plain", None, None, None))
+    assert msg.content == "plain"
+
+
+def test_init_db_adds_content_z_to_legacy_database(tmp_path):
+    db = str(tmp_path / "chat.db")
+    legacy = sqlite3.connect(db)
+    legacy.execute("""
+        CREATE TABLE chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            name TEXT,
+            tool_call_id TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    legacy.execute("INSERT INTO chat_messages (session_id, type, content) VALUES ('s', 'human', 'old')")
+    legacy.commit()
+    legacy.close()
+
+    conn = init_db(DBWriter(db).start(), db)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_messages)")}
+    assert "content_z" in columns
+    assert conn.execute("SELECT content, content_z FROM chat_messages").fetchall() == [("old", None)]
+
+
+def test_init_db_is_idempotent(tmp_path):
+    db = str(tmp_path / "chat.db")
+    writer = DBWriter(db).start()
+    init_db(writer, db)
+    conn = init_db(writer, db)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(chat_messages)")]
+    assert columns.count("content_z") == 1
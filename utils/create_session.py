@@ -1,7 +1,8 @@
 import uuid
+from utils.db_writer import submit_write
 def create_session(name: str, user_hash: str) -> str:
     """Create a new session and return its UUID."""
     session_id = str(uuid.uuid4())
-    cursor.execute("INSERT INTO sessions (id, name, user_hash) VALUES (?, ?, ?)", (session_id, name, user_hash))
-    conn.commit()
+    # Wait for the commit so the new session is visible to the next sidebar query
+    submit_write("INSERT INTO sessions (id, name, user_hash) VALUES (?, ?, ?)", (session_id, name, user_hash), wait=True)
     return session_id
\ No newline at end of file
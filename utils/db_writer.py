@@ -0,0 +1,109 @@
+import logging
+import queue
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+_writer_lock = threading.Lock()
+_writer = None
+
+class _WriteJob:
+    """A single queued statement plus the signal used to wait for its commit."""
+    __slots__ = ("sql", "params", "many", "waited", "done", "error", "result")
+
+    def __init__(self, sql, params, many, waited):
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.waited = waited
+        self.done = threading.Event()
+        self.error = None
+        self.result = None
+
+class DBWriter:
+    """
+    Owns the only write connection and commits queued jobs in batches on a daemon thread.
+    Each job runs in its own savepoint, so a failed job leaves nothing behind while the
+    rest of its batch still commits. Every job is signalled even when the commit fails;
+    errors nobody waits on are logged.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sqlite-writer")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, sql: str, params=(), many: bool = False, wait: bool = False):
+        """
+        Queue a write; with `wait=True`, block until it is committed and re-raise any DB error.
+        A waited INSERT returns its new row id, or the list of new row ids when `many` is set.
+        """
+        job = _WriteJob(sql, params, many, wait)
+        self.queue.put(job)
+        if wait:
+            job.done.wait()
+            if job.error is not None:
+                raise job.error
+            return job.result
+
+    def _run(self):
+        # Autocommit mode: transactions and savepoints are managed explicitly below
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Sorts and index builds (e.g. indexes created on an existing database) stay in memory
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        while True:
+            batch = [self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                conn.execute("BEGIN")
+                for job in batch:
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        job.result = self._execute(conn, job)
+                    except sqlite3.Error as e:
+                        job.error = e
+                        conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                conn.execute("COMMIT")
+            except Exception as e:
+                # The commit itself failed, so nothing in the batch was persisted
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for job in batch:
+                    job.error = job.error or e
+            finally:
+                for job in batch:
+                    if job.error is not None and not job.waited:
+                        logger.error("Background write failed: %s (%s)", job.error, job.sql.strip().splitlines()[0])
+                    job.done.set()
+
+    @staticmethod
+    def _execute(conn, job):
+        if not job.many:
+            return conn.execute(job.sql, job.params).lastrowid
+        cursor = conn.executemany(job.sql, job.params)
+        # One statement under the write lock, so its rows got consecutive ids ending at the last one
+        last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last - cursor.rowcount + 1, last + 1))
+
+def start_writer(db_path: str) -> DBWriter:
+    """Start the process-wide background writer once and return it."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = DBWriter(db_path).start()
+        return _writer
+
+def submit_write(sql: str, params=(), many: bool = False, wait: bool = False):
+    """Queue a write on the process-wide writer; see `DBWriter.submit`."""
+    return _writer.submit(sql, params, many=many, wait=wait)
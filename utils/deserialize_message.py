@@ -1,3 +1,4 @@
+import zstandard as zstd
 from langchain_core.messages import (
     HumanMessage,
     SystemMessage,
@@ -6,18 +7,22 @@ from langchain_core.messages import (
     ToolMessage,
     BaseMessage,
 )
+# Constructor per stored message type: (content, name, tool_call_id) -> message
+_CTORS = {
+    "human": lambda content, name, tool_call_id: HumanMessage(content=content),
+    "ai": lambda content, name, tool_call_id: AIMessage(content=content),
+    "system": lambda content, name, tool_call_id: SystemMessage(content=content),
+    "function": lambda content, name, tool_call_id: FunctionMessage(content=content, name=name or "function_1"),
+    "tool": lambda content, name, tool_call_id: ToolMessage(content=content, tool_call_id=tool_call_id or "tool_1"),
+}
+
 def deserialize_message(row: tuple) -> BaseMessage:
-    """Convert a DB row back to a LangChain message."""
-    msg_type, content, name, tool_call_id = row
-    if msg_type == "human":
-        return HumanMessage(content=content)
-    elif msg_type == "ai":
-        return AIMessage(content=content)
-    elif msg_type == "system":
-        return SystemMessage(content=content)
-    elif msg_type == "function":
-        return FunctionMessage(content=content, name=name or "function_1")
-    elif msg_type == "tool":
-        return ToolMessage(content=content, tool_call_id=tool_call_id or "tool_1")
-    else:
-        raise ValueError(f"Unknown message type: {msg_type}")
\ No newline at end of file
+    """Convert a DB row back to a LangChain message, decompressing `content_z` when present."""
+    msg_type, content, name, tool_call_id, content_z = row
+    if content_z is not None:
+        content = zstd.ZstdDecompressor().decompress(content_z).decode("utf-8")
+    try:
+        ctor = _CTORS[msg_type]
+    except KeyError:
+        raise ValueError(f"Unknown message type: {msg_type}") from None
+    return ctor(content, name, tool_call_id)
\ No newline at end of file
@@ -1,4 +1,3 @@
-def get_sessions_by_user(user_hash: str):
+def get_sessions_by_user(conn, user_hash: str):
     """Fetch all sessions associated with a user hash."""
-    cursor.execute("SELECT id, name FROM sessions WHERE user_hash = ? ORDER BY created_at DESC", (user_hash,))
-    return cursor.fetchall()
\ No newline at end of file
+    return conn.execute("SELECT id, name FROM sessions WHERE user_hash = ? ORDER BY created_at DESC", (user_hash,)).fetchall()
\ No newline at end of file
@@ -1,4 +1,8 @@
 import hashlib
 def hash_token(token: str) -> str:
     """Hash the API token for secure session identification."""
+    return hashlib.blake2b(token.encode(), digest_size=16, key=b"openai-agent").hexdigest()
+
+def legacy_hash_token(token: str) -> str:
+    """SHA-256 hash used before the switch to BLAKE2b; kept to migrate existing sessions."""
     return hashlib.sha256(token.encode()).hexdigest()
\ No newline at end of file
@@ -1,18 +1,39 @@
-from serialize_message import serialize_message
-from deserialize_message import deserialize_message
+from utils.serialize_message import serialize_message
+from utils.deserialize_message import deserialize_message
+from utils.db_writer import submit_write
+from langchain_core.messages import SystemMessage
 
-def load_history(session_id):
-    """Load all messages for a given session."""
-    cursor.execute("SELECT type, content, name, tool_call_id FROM chat_messages WHERE session_id = ?", (session_id,))
-    rows = cursor.fetchall()
-    return [deserialize_message(m) for m in rows] if rows else []
+def load_history(conn, session_id, limit=50, before_id=None):
+    """Load the most recent `limit` messages for a session, optionally only those older than `before_id`."""
+    rows = conn.execute("""
+        SELECT id, type, content, name, tool_call_id, content_z FROM chat_messages
+        WHERE session_id = ? AND (? IS NULL OR id < ?)
+        ORDER BY id DESC LIMIT ?
+    """, (session_id, before_id, before_id, limit)).fetchall()
+    messages = []
+    for row in reversed(rows):
+        msg = deserialize_message(row[1:])
+        msg.id = str(row[0])  # DB row id, used as the paging cursor
+        messages.append(msg)
+    return messages
+
+def trim_history(messages, max_messages):
+    """Drop the oldest non-system messages in place so at most `max_messages` of them stay in memory.
+    Returns the number of messages dropped."""
+    start = sum(1 for m in messages if isinstance(m, SystemMessage))
+    cut = len(messages) - max_messages
+    if cut <= start:
+        return 0
+    del messages[start:cut]
+    return cut - start
 
 def save_history(session_id, new_messages):
-    """Save a batch of new messages to the DB."""
-    for msg in new_messages:
-        data = serialize_message(msg, session_id)
-        cursor.execute("""
-            INSERT INTO chat_messages (session_id, type, content, name, tool_call_id)
-            VALUES (?, ?, ?, ?, ?)
-        """, (data["session_id"], data["type"], data["content"], data["name"], data["tool_call_id"]))
-    conn.commit()
\ No newline at end of file
+    """Save a batch of new messages in a single statement and stamp each with its new row id.
+    Waits for the commit so every message held in memory is known to be in the DB."""
+    rows = [serialize_message(msg, session_id) for msg in new_messages]
+    row_ids = submit_write("""
+        INSERT INTO chat_messages (session_id, type, content, name, tool_call_id, content_z)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows, many=True, wait=True)
+    for msg, row_id in zip(new_messages, row_ids):
+        msg.id = str(row_id)
\ No newline at end of file
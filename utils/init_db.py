@@ -0,0 +1,42 @@
+import sqlite3
+def init_db(writer, db_path: str):
+    """
+    Create or migrate the schema through `writer` and return the shared read-only connection.
+    The connection is shared across Streamlit script threads, so thread checks are off.
+    """
+    writer.submit("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            user_hash TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    writer.submit("""
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            type TEXT CHECK(type IN ('human', 'ai', 'system', 'tool', 'function')) NOT NULL,
+            content TEXT NOT NULL,
+            name TEXT,
+            tool_call_id TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            content_z BLOB
+        )
+    """, wait=True)
+
+    # Read-only connection for queries; WAL (set by the writer) lets it run alongside writes
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+    # Databases created before compressed storage lack the column
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_messages)")}
+    if "content_z" not in columns:
+        writer.submit("ALTER TABLE chat_messages ADD COLUMN content_z BLOB", wait=True)
+
+    writer.submit("CREATE INDEX IF NOT EXISTS idx_chat_session ON chat_messages(session_id, id)")
+    writer.submit("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_hash, created_at DESC)", wait=True)
+    return conn
\ No newline at end of file
@@ -0,0 +1,8 @@
+from utils.db_writer import submit_write
+def migrate_legacy_sessions(conn, legacy_hash: str, user_hash: str) -> bool:
+    """Re-key sessions stored under a pre-BLAKE2b hash; returns whether any were moved."""
+    # Cheap read first so logins without legacy rows never touch the writer
+    if conn.execute("SELECT 1 FROM sessions WHERE user_hash = ? LIMIT 1", (legacy_hash,)).fetchone() is None:
+        return False
+    submit_write("UPDATE sessions SET user_hash = ? WHERE user_hash = ?", (user_hash, legacy_hash), wait=True)
+    return True
\ No newline at end of file
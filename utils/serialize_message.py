@@ -1,19 +1,20 @@
+import zstandard as zstd
 from langchain_core.messages import (
     FunctionMessage,
     ToolMessage,
     BaseMessage,
 )
-def serialize_message(msg: BaseMessage, session_id: str):
-    """Convert a message into a row format for storage."""
-    base = {
-        "session_id": session_id,
-        "type": msg.type,
-        "content": msg.content,
-        "name": None,
-        "tool_call_id": None
-    }
-    if isinstance(msg, FunctionMessage):
-        base["name"] = msg.name
-    elif isinstance(msg, ToolMessage):
-        base["tool_call_id"] = msg.tool_call_id
-    return base
\ No newline at end of file
+# Shorter contents are stored as plain text; compression overhead outweighs the savings
+COMPRESS_MIN_BYTES = 256
+
+def serialize_message(msg: BaseMessage, session_id: str) -> tuple:
+    """Convert a message into a row tuple (session_id, type, content, name, tool_call_id, content_z) for storage.
+    Long text is zstd-compressed into `content_z`, leaving `content` empty."""
+    name = msg.name if isinstance(msg, FunctionMessage) else None
+    tool_call_id = msg.tool_call_id if isinstance(msg, ToolMessage) else None
+    content, content_z = msg.content, None
+    if isinstance(content, str):
+        raw = content.encode("utf-8")
+        if len(raw) > COMPRESS_MIN_BYTES:
+            content, content_z = "", zstd.ZstdCompressor(level=3).compress(raw)
+    return (session_id, msg.type, content, name, tool_call_id, content_z)
\ No newline at end of file
@@ -0,0 +1,6 @@
+from langchain_core.messages import SystemMessage
+def trim_context(messages: list, k: int = 12) -> list:
+    """Keep the system prompt plus the last `k` conversational messages for the LLM call."""
+    system = [m for m in messages if isinstance(m, SystemMessage)]
+    tail = [m for m in messages if not isinstance(m, SystemMessage)][-k:]
+    return system + tail
\ No newline at end of file